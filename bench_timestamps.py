@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+import random
+import time
+
+import timestamps
+
+# Compare the old per-record strptime loop with timestamps.parse_timestamps
+def bench(label, func, values, repeat=5):
+    best = min(_time(func, values) for _ in range(repeat))
+    print(f"{label:<40} {best * 1000:10.2f} ms  ({len(values) / best / 1e6:6.2f} M/s)")
+    return best
+
+def _time(func, values):
+    start = time.perf_counter()
+    func(values)
+    return time.perf_counter() - start
+
+def strptime_loop(values):
+    return [datetime.strptime(value, timestamps.TIMESTAMP_FORMAT) for value in values]
+
+if __name__ == '__main__':
+    count = 100_000
+    base = datetime(2024, 1, 1)
+    moments = [base + timedelta(seconds=random.randrange(365 * 24 * 3600)) for _ in range(count)]
+    iso = [m.strftime(timestamps.TIMESTAMP_FORMAT) for m in moments]
+    epoch = [int((m - datetime(1970, 1, 1)).total_seconds()) for m in moments]
+
+    assert timestamps.parse_timestamps(iso) == moments
+    assert timestamps.parse_timestamps(epoch) == moments
+
+    print(f"{count} timestamps, numpy {'available' if timestamps.np is not None else 'missing'}")
+    baseline = bench("strptime loop (ISO)", strptime_loop, iso)
+    for label, values in (("parse_timestamps (ISO)", iso), ("parse_timestamps (epoch)", epoch)):
+        print(f"{'':<40} speedup {baseline / bench(label, timestamps.parse_timestamps, values):.1f}x")
+    saved_np, timestamps.np = timestamps.np, None
+    print(f"{'':<40} speedup {baseline / bench('parse_timestamps (ISO, no numpy)', timestamps.parse_timestamps, iso):.1f}x")
+    timestamps.np = saved_np
@@ -0,0 +1,151 @@
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import click
+import uuid
+
+from final2 import app, db
+from timestamps import TIMESTAMP_FORMAT
+
+# Query plan regression check: run every route against seeded data, EXPLAIN ANALYZE each
+# statement it issued (DML included, rolled back afterwards), and fail when an expected
+# index is not used or a plan is over budget.
+# Point DATABASE_URL at a scratch database before running it.
+
+# Created by /create-user and enrolled by /enroll-user on every run, then removed again
+NEW_USER_ID = f"plancheck-{uuid.uuid4().hex[:12]}"
+
+RECENT_START = (datetime.utcnow() - timedelta(days=14)).strftime(TIMESTAMP_FORMAT)
+RECENT_END = datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+
+EXPLAINED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+PLAN_CHECKS = [
+    ("POST", "/create-user", {"user_id": NEW_USER_ID, "name": "Plan Check", "tags": ["site-3"]}, set()),
+    ("POST", "/enroll-user", {"user_id": NEW_USER_ID, "template_data": "cGxhbi1jaGVjaw=="}, {"users_user_id_key"}),
+    ("POST", "/get-template", {"user_id": "plan-42"}, {"users_user_id_key", "templates_user_id_key"}),
+    ("POST", "/mark-attendance", {"user_ids": ["plan-42", "plan-43"], "timestamps": ["2024-01-01T08:00:00Z", "2024-01-01T08:01:00Z"]}, {"users_user_id_key", "presence_pkey"}),
+    ("POST", "/get-attendance", {"user_ids": ["plan-42", "plan-43"], "start_time": "2000-01-01T00:00:00Z", "end_time": "2100-01-01T00:00:00Z"}, {"users_user_id_key", "ix_attendance_user_ts", "attendance_archive_pkey"}),
+    # Short enough to go through the day cache and its attendance_day_versions lookup
+    ("POST", "/get-attendance", {"user_ids": ["plan-42"], "start_time": RECENT_START, "end_time": RECENT_END}, {"users_user_id_key", "ix_attendance_user_ts"}),
+    ("POST", "/get-users-by-tags", {"tags": ["site-3", "dept-7"]}, {"ix_users_tags"}),
+    ("POST", "/get-presence", {"tags": ["site-3", "dept-7"]}, {"ix_users_tags"}),
+    ("GET", "/template-bundle", {"tags": ["site-3", "dept-7"]}, {"ix_users_tags", "templates_user_id_key"}),
+]
+
+PLAN_TABLES = ("users", "templates", "presence", "attendance", "attendance_archive")
+
+# Seed plan-* users with templates, presence, and hot and archived punches. Existing seed
+# data of a different size is removed first so --users and --punches-per-user always apply.
+def seed_plan_data(users, punches_per_user):
+    seeded_users, seeded_punches = db.session.execute(text("""
+        SELECT count(*), (SELECT coalesce(sum(cardinality(a.timestamps)), 0) FROM attendance_archive a JOIN users u ON u.id = a.user_id WHERE u.user_id LIKE 'plan-%')
+        FROM users WHERE user_id LIKE 'plan-%'
+    """)).one()
+    if seeded_users == users and seeded_punches == users * punches_per_user:
+        return
+    if seeded_users:
+        print(f"Reseeding: found {seeded_users} users with {seeded_punches} archived punches")
+        for table in ("attendance", "attendance_archive", "presence", "templates"):
+            db.session.execute(text(f"DELETE FROM {table} WHERE user_id IN (SELECT id FROM users WHERE user_id LIKE 'plan-%')"))
+        db.session.execute(text("DELETE FROM users WHERE user_id LIKE 'plan-%'"))
+
+    db.session.execute(text("""
+        INSERT INTO users (user_id, name, tags, created_at)
+        SELECT 'plan-' || i, 'Plan User ' || i, jsonb_build_array('site-' || (i % 20), 'dept-' || (i % 50)), now()
+        FROM generate_series(1, :users) i
+    """), {"users": users})
+    db.session.execute(text("INSERT INTO templates (user_id, template_data, created_at) SELECT id, md5(id::text), now() FROM users WHERE user_id LIKE 'plan-%'"))
+    db.session.execute(text("INSERT INTO presence (user_id, on_site, last_seen) SELECT id, random() < 0.3, now() FROM users WHERE user_id LIKE 'plan-%'"))
+    db.session.execute(text("""
+        INSERT INTO attendance (user_id, timestamp)
+        SELECT u.id, now() - random() * interval '300 days'
+        FROM users u, generate_series(1, :punches) WHERE u.user_id LIKE 'plan-%'
+    """), {"punches": punches_per_user})
+    db.session.execute(text("""
+        INSERT INTO attendance_archive (user_id, day, timestamps)
+        SELECT user_id, ts::date, array_agg(ts ORDER BY ts)
+        FROM (
+            SELECT u.id AS user_id, (now() - interval '400 days' - random() * interval '700 days')::timestamp AS ts
+            FROM users u, generate_series(1, :punches) WHERE u.user_id LIKE 'plan-%'
+        ) punches
+        GROUP BY user_id, ts::date
+    """), {"punches": punches_per_user})
+    db.session.commit()
+    for table in PLAN_TABLES:
+        db.session.execute(text(f"ANALYZE {table}"))
+    db.session.commit()
+
+# EXPLAIN ANALYZE a captured statement and roll it back. An INSERT the route already made
+# would now hit its own unique constraint, so those fall back to a plain EXPLAIN.
+def explain(statement, parameters):
+    try:
+        return db.session.connection().exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters).scalar()[0]["Plan"]
+    except IntegrityError:
+        db.session.rollback()
+        return db.session.connection().exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()[0]["Plan"]
+    finally:
+        db.session.rollback()
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+# Issue one route request and return every statement it sent to the database
+def capture_statements(client, method, path, payload):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # An executemany batch is explained with its first parameter set
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        if method == "GET":
+            response = client.get(path, query_string=payload)
+        else:
+            response = client.post(path, json={"id": "plan-check", "ts": datetime.utcnow().isoformat() + "Z", "pd": payload, "sig": ""})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return response, statements
+
+@click.command()
+@click.option("--users", default=10000, help="Users to seed")
+@click.option("--punches-per-user", default=100, help="Hot and archived punches to seed per user")
+@click.option("--cost-budget", default=5000.0, help="Maximum estimated total cost per statement")
+def check_query_plans(users, punches_per_user, cost_budget):
+    with app.app_context():
+        seed_plan_data(users, punches_per_user)
+        client = app.test_client()
+        failures = []
+        for method, path, payload, expected_indexes in PLAN_CHECKS:
+            response, statements = capture_statements(client, method, path, payload)
+            if response.status_code >= 400:
+                failures.append(f"{path}: returned {response.status_code}")
+                continue
+
+            used_indexes = set()
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+                    continue
+                plan = explain(statement, parameters)
+                used_indexes.update(n["Index Name"] for n in plan_nodes(plan) if "Index Name" in n)
+                if plan["Total Cost"] > cost_budget:
+                    failures.append(f"{path}: estimated cost {plan['Total Cost']} over budget for {' '.join(statement.split())[:120]}")
+            for index in expected_indexes - used_indexes:
+                failures.append(f"{path}: expected index {index} was not used")
+            print(f"{path}: {len(statements)} statements, indexes used: {', '.join(sorted(used_indexes)) or 'none'}")
+
+        db.session.execute(text("DELETE FROM templates WHERE user_id IN (SELECT id FROM users WHERE user_id = :user_id)"), {"user_id": NEW_USER_ID})
+        db.session.execute(text("DELETE FROM users WHERE user_id = :user_id"), {"user_id": NEW_USER_ID})
+        db.session.commit()
+
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        raise SystemExit(1)
+    print("All query plans OK")
+
+if __name__ == '__main__':
+    check_query_plans()
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Exactly the shape TIMESTAMP_FORMAT produces; fromisoformat alone accepts offsets and spaces
+TIMESTAMP_SHAPE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z", re.ASCII)
+
+# Integer epoch batches at least this large are converted with NumPy datetime64 in one pass.
+# ISO strings always go through datetime.fromisoformat: building a NumPy string array and
+# converting it back costs more than fromisoformat itself.
+VECTORIZE_THRESHOLD = 256
+
+# Parse one "YYYY-MM-DDTHH:MM:SSZ" string or integer epoch seconds into a naive UTC datetime
+def parse_timestamp(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str) and TIMESTAMP_SHAPE.fullmatch(value):
+        try:
+            return datetime.fromisoformat(value[:-1])
+        except ValueError:
+            return None
+    return None
+
+# Parse a batch of timestamps, returning None for every entry that is invalid
+def parse_timestamps(values):
+    if np is not None and len(values) >= VECTORIZE_THRESHOLD:
+        parsed = _parse_epoch_array(values)
+        if parsed is not None:
+            return parsed
+    return [parse_timestamp(value) for value in values]
+
+# All-integer fast path; returns None so the caller falls back to per-entry parsing
+def _parse_epoch_array(values):
+    # type() rather than isinstance() so bools, which NumPy would treat as 0/1, are excluded
+    if not all(type(value) is int for value in values):
+        return None
+    try:
+        array = np.asarray(values)
+        if array.dtype.kind != "i":
+            return None
+        parsed = array.astype("datetime64[s]").tolist()
+    except (ValueError, OverflowError, TypeError):
+        return None
+    if not all(isinstance(value, datetime) for value in parsed):
+        return None
+    return parsed